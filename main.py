@@ -3,7 +3,14 @@ import logging
 import json
 import sqlite3
 import re
+import time
+import socket
+import asyncio
+import ipaddress
+from collections import OrderedDict
 from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+import aiohttp
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -25,6 +32,20 @@ bot = Bot(token=BOT_TOKEN)
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
+# Проверка ссылок кнопок (по умолчанию выключена).
+# Бот сам ходит по ссылкам пользователей, поэтому адреса loopback, частных,
+# link-local и зарезервированных сетей не проверяются (в том числе после
+# редиректа). Имя резолвится отдельно от запроса, так что от DNS rebinding
+# это не защищает — на сервере с доступом во внутреннюю сеть включать с осторожностью.
+URL_CHECK_ENABLED = os.getenv('URL_CHECK_ENABLED', '0').lower() in ('1', 'true', 'yes')
+URL_CHECK_TIMEOUT = float(os.getenv('URL_CHECK_TIMEOUT', '3'))      # таймаут одного запроса, сек
+URL_CHECK_BUDGET = float(os.getenv('URL_CHECK_BUDGET', '4'))        # максимум ожидания ответа бота, сек
+URL_CHECK_CONCURRENCY = int(os.getenv('URL_CHECK_CONCURRENCY', '8'))
+URL_CHECK_TTL = int(os.getenv('URL_CHECK_TTL', '600'))              # время жизни кэша, сек
+URL_CHECK_CACHE_SIZE = int(os.getenv('URL_CHECK_CACHE_SIZE', '1000'))
+URL_CHECK_MAX_REDIRECTS = 5
+URL_CHECK_ALLOW_PRIVATE = os.getenv('URL_CHECK_ALLOW_PRIVATE', '0').lower() in ('1', 'true', 'yes')  # только для локальной отладки
+
 # ==================== БАЗА ДАННЫХ ====================
 
 def init_db():
@@ -97,6 +118,131 @@ def update_button(button_id: int, user_id: int, new_text: str, new_url: str) ->
     conn.close()
     return updated
 
+# ==================== ПРОВЕРКА ССЫЛОК ====================
+
+# Общий для всех пользователей кэш: url -> (ссылка рабочая, истекает в).
+# Хранятся только однозначные ответы сервера; таймауты, сетевые ошибки,
+# 429 и 5xx считаются «неизвестно» и не кэшируются.
+_url_cache = OrderedDict()
+_url_inflight = {}
+_url_session = None
+_url_semaphore = None
+
+def _get_url_session() -> aiohttp.ClientSession:
+    global _url_session
+    if _url_session is None or _url_session.closed:
+        _url_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=URL_CHECK_TIMEOUT))
+    return _url_session
+
+def _get_url_semaphore() -> asyncio.Semaphore:
+    global _url_semaphore
+    if _url_semaphore is None:
+        _url_semaphore = asyncio.Semaphore(URL_CHECK_CONCURRENCY)
+    return _url_semaphore
+
+async def close_url_session():
+    global _url_session
+    if _url_session is not None and not _url_session.closed:
+        await _url_session.close()
+    _url_session = None
+
+async def _is_public_host(host: str) -> bool:
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except (socket.gaierror, UnicodeError):
+        return False
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split('%')[0])
+        if getattr(ip, 'ipv4_mapped', None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            return False
+    return bool(infos)
+
+async def _is_public_url(url: str) -> bool:
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return False
+    if URL_CHECK_ALLOW_PRIVATE:
+        return True
+    return await _is_public_host(parts.hostname)
+
+async def _request_status(session: aiohttp.ClientSession, method: str, url: str):
+    # Редиректы проходим вручную, чтобы проверить адрес каждого перехода
+    for _ in range(URL_CHECK_MAX_REDIRECTS + 1):
+        if not await _is_public_url(url):
+            logger.info(f"Ссылка не проверяется (закрытый адрес): {url}")
+            return None
+        async with session.request(method, url, allow_redirects=False) as resp:
+            location = resp.headers.get('Location')
+            if resp.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(str(resp.url), location)
+                continue
+            return resp.status
+    return None
+
+async def _fetch_url_ok(url: str):
+    """True — ссылка рабочая, False — сервер ответил ошибкой, None — неизвестно."""
+    session = _get_url_session()
+    async with _get_url_semaphore():
+        try:
+            status = await _request_status(session, 'HEAD', url)
+            # Некоторые сайты не поддерживают HEAD — повторяем через GET
+            if status in (403, 405, 501):
+                status = await _request_status(session, 'GET', url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.info(f"Не удалось проверить ссылку {url}: {e!r}")
+            return None
+    if status is None or status == 429 or status >= 500:
+        return None
+    return status < 400
+
+async def _check_url(url: str):
+    try:
+        ok = await _fetch_url_ok(url)
+        if ok is not None:
+            _url_cache[url] = (ok, time.monotonic() + URL_CHECK_TTL)
+            _url_cache.move_to_end(url)
+            while len(_url_cache) > URL_CHECK_CACHE_SIZE:
+                _url_cache.popitem(last=False)
+        return ok
+    finally:
+        _url_inflight.pop(url, None)
+
+async def find_dead_urls(urls) -> set:
+    """Параллельно проверяет ссылки и возвращает нерабочие.
+
+    Нерабочей считается только ссылка, на которую сервер ответил 4xx (кроме 429).
+    Ждёт не дольше URL_CHECK_BUDGET: не успевшие проверки считаются рабочими
+    и продолжают выполняться в фоне, заполняя кэш для следующих запросов.
+    """
+    if not URL_CHECK_ENABLED:
+        return set()
+
+    now = time.monotonic()
+    dead = set()
+    tasks = {}
+    for url in dict.fromkeys(urls):
+        if not url.startswith(('http://', 'https://')):
+            continue
+        cached = _url_cache.get(url)
+        if cached and cached[1] > now:
+            if not cached[0]:
+                dead.add(url)
+            continue
+        task = _url_inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(_check_url(url))
+            _url_inflight[url] = task
+        tasks[task] = url
+
+    if tasks:
+        done, _ = await asyncio.wait(tasks, timeout=URL_CHECK_BUDGET)
+        for task in done:
+            if not task.cancelled() and task.exception() is None and task.result() is False:
+                dead.add(tasks[task])
+    return dead
+
 # ==================== FSM СОСТОЯНИЯ ====================
 
 class PostForm(StatesGroup):
@@ -226,6 +372,11 @@ async def process_add_button_url(message: types.Message, state: FSMContext):
     if button_url.startswith('t.me/'):
         button_url = 'https://' + button_url
     
+    if await find_dead_urls([button_url]):
+        await message.answer(f"❌ Ссылка недоступна: `{button_url}`", parse_mode=ParseMode.MARKDOWN, reply_markup=main_keyboard())
+        await state.clear()
+        return
+    
     if save_button(message.from_user.id, button_text, button_url):
         await message.answer(f"✅ **Кнопка сохранена!**\n\n**Текст:** `{button_text}`\n**Ссылка:** `{button_url}`", parse_mode=ParseMode.MARKDOWN)
     else:
@@ -312,6 +463,11 @@ async def process_edit_url(message: types.Message, state: FSMContext):
     if new_url.startswith('t.me/'):
         new_url = 'https://' + new_url
     
+    if await find_dead_urls([new_url]):
+        await message.answer(f"❌ Ссылка недоступна: `{new_url}`", parse_mode=ParseMode.MARKDOWN, reply_markup=main_keyboard())
+        await state.clear()
+        return
+    
     if update_button(button_id, message.from_user.id, new_text, new_url):
         await message.answer(f"✅ **Кнопка обновлена!**\n\n**Новый текст:** `{new_text}`\n**Новая ссылка:** `{new_url}`", parse_mode=ParseMode.MARKDOWN)
         await cmd_my_buttons(message)
@@ -549,7 +705,7 @@ async def handle_buttons_input(message: types.Message, state: FSMContext):
         return
     
     lines = text.strip().split('\n')
-    all_buttons = []
+    parsed_rows = []
     
     for line in lines:
         if '|' in line:
@@ -563,9 +719,8 @@ async def handle_buttons_input(message: types.Message, state: FSMContext):
                         if btn_url.startswith('t.me/'):
                             btn_url = 'https://' + btn_url
                         row.append({'text': btn_name.strip(), 'url': btn_url.strip()})
-                        save_button(message.from_user.id, btn_name.strip(), btn_url.strip())
             if row:
-                all_buttons.append(row)
+                parsed_rows.append(row)
         else:
             parts = re.split(r'\s*[-|]\s*', line.strip(), maxsplit=1)
             if len(parts) == 2:
@@ -573,8 +728,22 @@ async def handle_buttons_input(message: types.Message, state: FSMContext):
                 if btn_url.startswith(('http://', 'https://', 'tg://', 't.me/')):
                     if btn_url.startswith('t.me/'):
                         btn_url = 'https://' + btn_url
-                    all_buttons.append([{'text': btn_name.strip(), 'url': btn_url.strip()}])
-                    save_button(message.from_user.id, btn_name.strip(), btn_url.strip())
+                    parsed_rows.append([{'text': btn_name.strip(), 'url': btn_url.strip()}])
+    
+    dead_urls = await find_dead_urls(btn['url'] for row in parsed_rows for btn in row)
+    if dead_urls:
+        await message.answer(
+            "⚠️ **Недоступные ссылки пропущены:**\n" + "\n".join(f"• `{url}`" for url in dead_urls),
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
+    all_buttons = []
+    for row in parsed_rows:
+        row = [btn for btn in row if btn['url'] not in dead_urls]
+        for btn in row:
+            save_button(message.from_user.id, btn['text'], btn['url'])
+        if row:
+            all_buttons.append(row)
     
     if all_buttons:
         data = await state.get_data()
@@ -655,10 +824,12 @@ async def finish_post(message: types.Message, state: FSMContext):
 async def main():
     logger.info("🚀 Бот-генератор с множественным выбором запускается...")
     await bot.delete_webhook()
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await close_url_session()
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
 @dp.message(F.text == "❌ Отмена")
 async def cmd_cancel(message: types.Message, state: FSMContext):
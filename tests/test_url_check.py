@@ -0,0 +1,183 @@
+import asyncio
+import importlib
+import os
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    # main.py создаёт templates.db в текущей папке и требует токен при импорте
+    monkeypatch.chdir(tmp_path)
+    os.environ.setdefault('BOT_TOKEN', '123456:TEST')
+    module = importlib.import_module('main')
+    monkeypatch.setattr(module, 'URL_CHECK_ENABLED', True)
+    monkeypatch.setattr(module, 'URL_CHECK_ALLOW_PRIVATE', True)
+    monkeypatch.setattr(module, 'URL_CHECK_BUDGET', 1.0)
+    monkeypatch.setattr(module, '_url_session', None)
+    monkeypatch.setattr(module, '_url_semaphore', None)
+    module._url_cache.clear()
+    module._url_inflight.clear()
+    return module
+
+
+@asynccontextmanager
+async def stub_server(main, hits):
+    async def ok(request):
+        hits.append(request.path)
+        return web.Response(text='ok')
+
+    async def no_head(request):
+        hits.append(request.path)
+        if request.method == 'HEAD':
+            return web.Response(status=405)
+        return web.Response(text='ok')
+
+    async def missing(request):
+        hits.append(request.path)
+        return web.Response(status=404)
+
+    async def busy(request):
+        hits.append(request.path)
+        return web.Response(status=503)
+
+    async def slow(request):
+        hits.append(request.path)
+        await asyncio.sleep(0.5)
+        return web.Response(text='ok')
+
+    async def redirect(request):
+        hits.append(request.path)
+        raise web.HTTPFound(f"http://localhost:{request.url.port}/ok")
+
+    app = web.Application()
+    for path, handler in (('/ok', ok), ('/no-head', no_head), ('/missing', missing),
+                          ('/busy', busy), ('/slow', slow), ('/redirect', redirect)):
+        app.router.add_route('*', path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await asyncio.gather(*list(main._url_inflight.values()), return_exceptions=True)
+        await main.close_url_session()
+        await runner.cleanup()
+
+
+def run_with_stub(main, scenario):
+    hits = []
+
+    async def runner():
+        async with stub_server(main, hits) as base:
+            await scenario(base)
+
+    asyncio.run(runner())
+    return hits
+
+
+def test_head_405_falls_back_to_get(main):
+    async def scenario(base):
+        assert await main.find_dead_urls([base + '/no-head']) == set()
+
+    assert run_with_stub(main, scenario) == ['/no-head', '/no-head']
+
+
+def test_404_is_dead(main):
+    async def scenario(base):
+        assert await main.find_dead_urls([base + '/missing', base + '/ok']) == {base + '/missing'}
+
+    run_with_stub(main, scenario)
+
+
+def test_5xx_is_unknown_and_not_cached(main):
+    async def scenario(base):
+        assert await main.find_dead_urls([base + '/busy']) == set()
+        assert base + '/busy' not in main._url_cache
+
+    run_with_stub(main, scenario)
+
+
+def test_timeout_is_unknown_and_not_cached(main, monkeypatch):
+    monkeypatch.setattr(main, 'URL_CHECK_TIMEOUT', 0.1)
+
+    async def scenario(base):
+        assert await main.find_dead_urls([base + '/slow']) == set()
+        assert base + '/slow' not in main._url_cache
+
+    run_with_stub(main, scenario)
+
+
+def test_slow_url_is_alive_within_budget(main, monkeypatch):
+    monkeypatch.setattr(main, 'URL_CHECK_BUDGET', 0.1)
+
+    async def scenario(base):
+        started = time.monotonic()
+        assert await main.find_dead_urls([base + '/slow']) == set()
+        assert time.monotonic() - started < 0.4
+        # Проверка доходит в фоне и попадает в кэш
+        await asyncio.gather(*list(main._url_inflight.values()))
+        assert main._url_cache[base + '/slow'][0] is True
+
+    run_with_stub(main, scenario)
+
+
+def test_cache_hit_makes_no_request(main):
+    async def scenario(base):
+        await main.find_dead_urls([base + '/missing'])
+        assert await main.find_dead_urls([base + '/missing']) == {base + '/missing'}
+
+    assert run_with_stub(main, scenario) == ['/missing']
+
+
+def test_concurrent_callers_share_one_check(main):
+    async def scenario(base):
+        first, second = await asyncio.gather(
+            main.find_dead_urls([base + '/slow']),
+            main.find_dead_urls([base + '/slow']),
+        )
+        assert first == second == set()
+
+    assert run_with_stub(main, scenario) == ['/slow']
+
+
+def test_cache_size_is_capped(main, monkeypatch):
+    monkeypatch.setattr(main, 'URL_CHECK_CACHE_SIZE', 2)
+
+    async def scenario(base):
+        await main.find_dead_urls([base + '/ok?a', base + '/ok?b', base + '/ok?c'])
+        assert len(main._url_cache) == 2
+        await main.find_dead_urls([base + '/ok?d'])
+        assert len(main._url_cache) == 2
+        assert list(main._url_cache)[-1] == base + '/ok?d'
+
+    run_with_stub(main, scenario)
+
+
+def test_private_hosts_are_not_requested(main, monkeypatch):
+    monkeypatch.setattr(main, 'URL_CHECK_ALLOW_PRIVATE', False)
+
+    async def scenario(base):
+        assert await main.find_dead_urls([base + '/missing', 'http://169.254.169.254/']) == set()
+
+    assert run_with_stub(main, scenario) == []
+
+
+def test_redirect_to_private_host_is_not_followed(main, monkeypatch):
+    monkeypatch.setattr(main, 'URL_CHECK_ALLOW_PRIVATE', False)
+
+    async def only_127(host):
+        return host == '127.0.0.1'
+
+    monkeypatch.setattr(main, '_is_public_host', only_127)
+
+    async def scenario(base):
+        assert await main.find_dead_urls([base + '/redirect']) == set()
+        assert base + '/redirect' not in main._url_cache
+
+    assert run_with_stub(main, scenario) == ['/redirect']